@@ -5,8 +5,12 @@ from app.routes import edl_bp
 from app.auth import auth_bp, login_manager, jwt
 from app.api import api_bp
 from app.user import user_bp
+from app.audit import audit_log
+from app.mirror import mirror_sync
+from app.snapshot import snapshots
 
-def create_app():
+def create_app(start_background=True):
+    """Create the Flask app. Pass start_background=False in processes that do not serve requests."""
     app = Flask(__name__)
     app.config.from_object(Config)  # Load configuration
 
@@ -16,6 +20,9 @@ def create_app():
     # Initialize Flask Extensions
     jwt.init_app(app)
     login_manager.init_app(app)
+    audit_log.init_app(app, start=start_background)
+    mirror_sync.init_app(app, start=start_background)  # No-op unless SENTINEDL_MODE=mirror
+    snapshots.init_app(app)
 
     # Register Blueprints
     app.register_blueprint(edl_bp)
@@ -1,9 +1,20 @@
+import hmac
+import json
 import re
 
-from flask import Blueprint, request, jsonify, make_response
+from datetime import datetime
+from functools import wraps
+
+from flask import Blueprint, request, jsonify, make_response, current_app, Response
 from flask_restful import Resource, Api
 from app.database import SessionLocal
-from app.models import EDL, Entry
+from app.models import EDL, Entry, AuditLog, MirrorState
+from app.audit import audit_log, record_event
+from app.entries import (
+    classify_entry_value, bump_revision, parse_entry_filter,
+    delete_entries_by_filter, delete_entries_by_values, replace_entries,
+)
+from app.snapshot import snapshots, set_cache_headers, stream_in_chunks
 from flask_login import login_required, current_user
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
@@ -59,6 +70,8 @@ class EDLListResource(Resource):
         session.commit()
         session.close()
 
+        record_event("create", "edl", name, username=current_admin)
+
         return make_response(jsonify({"message": "EDL created successfully!", "name": name}), 201)
 
 # ------------------------------
@@ -90,10 +103,12 @@ class EDLResource(Resource):
         session.commit()
         session.close()
 
+        record_event("delete", "edl", edl_name, username=get_jwt_identity())
+
         return make_response(jsonify({"message": f"EDL '{edl_name}' deleted successfully"}), 200)
 
 # ------------------------------
-# Entries (GET, POST)
+# Entries (GET, POST, PUT, DELETE)
 # ------------------------------
 class EDLEntriesResource(Resource):
     def get(self, edl_name):
@@ -105,13 +120,19 @@ class EDLEntriesResource(Resource):
             session.close()
             return make_response(jsonify({"error": "EDL not found"}), 404)
 
-        entries = session.query(Entry).filter_by(edl_id=edl.id).all()
+        snapshot, stale = snapshots.serve(session, edl)
         session.close()
 
-        return jsonify([
-            {"id": entry.id, "value": entry.value, "description": entry.description, "created_at": str(entry.created_at)}
-            for entry in entries
-        ])
+        def generate():
+            yield "["
+            for index, (entry_id, value, description, _, created_at) in enumerate(snapshot.rows()):
+                entry = json.dumps({"created_at": str(created_at), "description": description, "id": entry_id, "value": value})
+                yield f", {entry}" if index else entry
+            yield "]\n"
+
+        response = Response(stream_in_chunks(generate()), content_type="application/json")
+        set_cache_headers(response, snapshot.meta, "api", stale)
+        return response.make_conditional(request)
 
     @jwt_required()
     def post(self, edl_name):
@@ -128,13 +149,104 @@ class EDLEntriesResource(Resource):
             session.close()
             return make_response(jsonify({"error": "EDL not found"}), 404)
 
-        new_entry = Entry(edl_id=edl.id, value=value, description=description, created_by=current_admin)
+        new_entry = Entry(edl_id=edl.id, value=value, description=description,
+                          entry_type=classify_entry_value(value), created_by=current_admin)
         session.add(new_entry)
+        bump_revision(session, edl.id)
         session.commit()
         session.close()
 
+        record_event("create", "entry", value, username=current_admin, details=f"edl={edl_name}")
+
         return make_response(jsonify({"message": "Entry added successfully!", "value": value}), 201)
 
+    @jwt_required()
+    def delete(self, edl_name):
+        """Bulk delete entries matching a filter or a list of values"""
+        data = request.get_json(silent=True)
+        current_admin = get_jwt_identity()
+
+        if not isinstance(data, dict) or not data:
+            return make_response(jsonify({"error": "Invalid JSON"}), 400)
+
+        values = data.get("values")
+        filters = None
+        if values is not None:
+            if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+                return make_response(jsonify({"error": "values must be a list of strings."}), 400)
+            values = [v.strip() for v in values]
+        else:
+            filter_data = data.get("filter") or {}
+            if not isinstance(filter_data, dict):
+                return make_response(jsonify({"error": "filter must be an object."}), 400)
+            filters, error = parse_entry_filter(filter_data)
+            if error:
+                return make_response(jsonify({"error": error}), 400)
+
+        session = SessionLocal()
+        edl = session.query(EDL).filter_by(name=edl_name).first()
+
+        if not edl:
+            session.close()
+            return make_response(jsonify({"error": "EDL not found"}), 404)
+
+        if values is not None:
+            deleted = delete_entries_by_values(session, edl.id, values)
+        else:
+            deleted = delete_entries_by_filter(session, edl.id, filters)
+        session.commit()
+        session.close()
+
+        record_event("delete", "entry", edl_name, username=current_admin, details=f"bulk: {deleted} entries")
+
+        return make_response(jsonify({"message": "Entries deleted successfully!", "deleted": deleted}), 200)
+
+    @jwt_required()
+    def put(self, edl_name):
+        """Replace the contents of an EDL, applying only the difference"""
+        data = request.get_json(silent=True)
+        current_admin = get_jwt_identity()
+
+        if not isinstance(data, dict):
+            return make_response(jsonify({"error": "Invalid JSON"}), 400)
+        if not isinstance(data.get("entries"), list):
+            return make_response(jsonify({"error": "entries must be a list."}), 400)
+
+        entries = {}
+        for item in data["entries"]:
+            if isinstance(item, str):
+                item = {"value": item}
+            if not isinstance(item, dict):
+                return make_response(jsonify({"error": "Each entry must be a string or an object."}), 400)
+
+            value = str(item.get("value", "")).strip()
+            if not classify_entry_value(value):
+                return make_response(jsonify({"error": f"Invalid entry value: {value}"}), 400)
+
+            description = str(item.get("description") or "").strip()
+            if len(description) > 50:
+                return make_response(jsonify({"error": "Description must not exceed 50 characters."}), 400)
+            if re.search(r"[<>'\";%&()]", description):
+                return make_response(jsonify({"error": "Description contains invalid characters."}), 400)
+
+            entries[value] = description
+
+        session = SessionLocal()
+        edl = session.query(EDL).filter_by(name=edl_name).first()
+
+        if not edl:
+            session.close()
+            return make_response(jsonify({"error": "EDL not found"}), 404)
+
+        result = replace_entries(session, edl.id, entries, current_admin)
+        session.commit()
+        session.close()
+
+        record_event("import", "edl", edl_name, username=current_admin,
+                     details=f"added={result['added']} removed={result['removed']} updated={result['updated']}")
+
+        return make_response(jsonify({"message": "EDL contents replaced successfully!", **result}), 200)
+
 # ------------------------------
 # Single Entry (DELETE)
 # ------------------------------
@@ -149,12 +261,164 @@ class EntryResource(Resource):
             session.close()
             return make_response(jsonify({"error": "Entry not found"}), 404)
 
+        value = entry.value
         session.delete(entry)
+        bump_revision(session, entry.edl_id)
         session.commit()
         session.close()
 
+        record_event("delete", "entry", value, username=get_jwt_identity(), details=f"entry_id={entry_id}")
+
         return make_response(jsonify({"message": "Entry deleted successfully!"}), 200)
 
+# ------------------------------
+# Audit Log (GET)
+# ------------------------------
+class AuditLogResource(Resource):
+    @jwt_required()
+    def get(self):
+        """Return audit events, newest first, with optional filters and pagination."""
+        try:
+            page = max(int(request.args.get("page", 1)), 1)
+            per_page = min(max(int(request.args.get("per_page", 50)), 1), 500)
+        except ValueError:
+            return make_response(jsonify({"error": "page and per_page must be integers."}), 400)
+
+        # Make sure buffered events are visible to the query
+        audit_log.flush()
+
+        session = SessionLocal()
+        query = session.query(AuditLog)
+
+        for field in ("action", "username", "target_type"):
+            value = request.args.get(field)
+            if value:
+                query = query.filter(getattr(AuditLog, field) == value)
+
+        total = query.count()
+        events = (
+            query.order_by(AuditLog.id.desc())
+            .offset((page - 1) * per_page)
+            .limit(per_page)
+            .all()
+        )
+        session.close()
+
+        return jsonify({
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "events": [
+                {
+                    "id": event.id,
+                    "timestamp": event.timestamp.isoformat(),
+                    "username": event.username,
+                    "action": event.action,
+                    "target_type": event.target_type,
+                    "target": event.target,
+                    "details": event.details,
+                }
+                for event in events
+            ],
+        })
+
+# ------------------------------
+# Replication (GET)
+# ------------------------------
+def replication_token_required(fn):
+    """Require the shared REPLICATION_TOKEN in the X-Replication-Token header."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        expected = current_app.config.get("REPLICATION_TOKEN")
+        if not expected:
+            return make_response(jsonify({"error": "Replication is disabled on this instance."}), 403)
+        if not hmac.compare_digest(request.headers.get("X-Replication-Token", ""), expected):
+            return make_response(jsonify({"error": "Invalid replication token."}), 401)
+        return fn(*args, **kwargs)
+    return wrapper
+
+class ReplicationEDLListResource(Resource):
+    method_decorators = [replication_token_required]
+
+    def get(self):
+        """Return the current revision of every EDL, polled by mirror nodes."""
+        session = SessionLocal()
+        edls = session.query(EDL.id, EDL.name, EDL.description, EDL.revision, EDL.created_at).all()
+        session.close()
+        # id and created_at tell apart a list deleted and recreated under the same name
+        return jsonify([
+            {"id": edl_id, "name": name, "description": description, "revision": revision,
+             "created_at": created_at.isoformat()}
+            for edl_id, name, description, revision, created_at in edls
+        ])
+
+class ReplicationSnapshotResource(Resource):
+    method_decorators = [replication_token_required]
+
+    def get(self, edl_name):
+        """Stream a full snapshot of an EDL, pulled by mirror nodes when its revision changes."""
+        session = SessionLocal()
+        edl = session.query(EDL).filter_by(name=edl_name).first()
+
+        if not edl:
+            session.close()
+            return make_response(jsonify({"error": "EDL not found"}), 404)
+
+        snapshot = snapshots.get(session, edl)
+        session.close()
+
+        def generate():
+            meta = snapshot.meta
+            header = json.dumps({
+                "id": meta.id,
+                "name": meta.name,
+                "description": meta.description,
+                "created_by": meta.created_by,
+                "created_at": meta.created_at.isoformat(),
+                "revision": meta.revision,
+            })
+            yield header[:-1] + ', "entries": ['
+            for index, (entry_id, value, description, created_by, created_at) in enumerate(snapshot.rows()):
+                entry = json.dumps({
+                    "id": entry_id,
+                    "value": value,
+                    "description": description,
+                    "entry_type": snapshot.entry_type(index),
+                    "created_by": created_by,
+                    "created_at": created_at.isoformat(),
+                })
+                yield f", {entry}" if index else entry
+            yield "]}\n"
+
+        return Response(stream_in_chunks(generate()), content_type="application/json")
+
+class ReplicationStatusResource(Resource):
+    def get(self):
+        """Report per-list replication state and lag on a mirror node."""
+        session = SessionLocal()
+        states = session.query(MirrorState).order_by(MirrorState.edl_name).all()
+        session.close()
+
+        mode = current_app.config.get("SENTINEDL_MODE")
+        now = datetime.utcnow()
+        return jsonify({
+            "mode": mode,
+            "primary_url": current_app.config.get("PRIMARY_URL") if mode == "mirror" else None,
+            "lists": [
+                {
+                    "name": state.edl_name,
+                    "primary_revision": state.primary_revision,
+                    "synced_revision": state.synced_revision,
+                    "revision_lag": (state.primary_revision or 0) - (state.synced_revision or 0),
+                    "last_checked_at": state.last_checked_at.isoformat() if state.last_checked_at else None,
+                    "last_synced_at": state.last_synced_at.isoformat() if state.last_synced_at else None,
+                    "lag_seconds": (now - state.last_checked_at).total_seconds() if state.last_checked_at else None,
+                    "last_error": state.last_error,
+                }
+                for state in states
+            ],
+        })
+
 # ------------------------------
 # Register API Endpoints
 # ------------------------------
@@ -162,3 +426,7 @@ api.add_resource(EDLListResource, "/edls")
 api.add_resource(EDLResource, "/edls/<string:edl_name>")
 api.add_resource(EDLEntriesResource, "/edls/<string:edl_name>/entries")
 api.add_resource(EntryResource, "/entries/<int:entry_id>")
+api.add_resource(AuditLogResource, "/audit")
+api.add_resource(ReplicationEDLListResource, "/replication/edls")
+api.add_resource(ReplicationSnapshotResource, "/replication/edls/<string:edl_name>")
+api.add_resource(ReplicationStatusResource, "/replication/status")
@@ -0,0 +1,110 @@
+import atexit
+import threading
+from datetime import datetime
+from app.database import SessionLocal
+from app.models import AuditLog
+
+
+class AuditBuffer:
+    """Write-behind buffer for audit events.
+
+    Events are kept in memory and persisted to the ``audit_log`` table in
+    batches by a background thread, so recording an event never adds a
+    commit to the request that triggered it. While the database is
+    unavailable at most ``max_buffered`` events are kept; older ones are
+    dropped and counted in ``dropped``.
+    """
+
+    def __init__(self, batch_size=100, flush_interval=5.0, max_buffered=10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.dropped = 0
+        self._events = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def init_app(self, app, start=True):
+        """Configure the buffer from the Flask config and start the flusher thread."""
+        self.batch_size = app.config.get("AUDIT_BATCH_SIZE", self.batch_size)
+        self.flush_interval = app.config.get("AUDIT_FLUSH_INTERVAL", self.flush_interval)
+        self.max_buffered = app.config.get("AUDIT_MAX_BUFFERED", self.max_buffered)
+        if start:
+            self.start()
+
+    def start(self):
+        """Start the background flusher (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="audit-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def record(self, action, target_type, target=None, username=None, details=None):
+        """Queue an audit event. Returns immediately; persistence happens later."""
+        event = {
+            "timestamp": datetime.utcnow(),
+            "username": str(username) if username is not None else None,
+            "action": action,
+            "target_type": target_type,
+            "target": str(target) if target is not None else None,
+            "details": details,
+        }
+        with self._lock:
+            self._events.append(event)
+            self._trim()
+            full = len(self._events) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def _trim(self):
+        """Drop the oldest events beyond ``max_buffered``. Call with ``_lock`` held."""
+        overflow = len(self._events) - self.max_buffered
+        if overflow > 0:
+            del self._events[:overflow]
+            self.dropped += overflow
+
+    def flush(self):
+        """Persist buffered events, one transaction per ``batch_size`` events."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = self._events[:self.batch_size]
+                    del self._events[:len(batch)]
+                if not batch:
+                    return written
+
+                session = SessionLocal()
+                try:
+                    session.execute(AuditLog.__table__.insert(), batch)
+                    session.commit()
+                except Exception:
+                    session.rollback()
+                    # Put the batch back so it is retried on the next flush
+                    with self._lock:
+                        self._events[:0] = batch
+                        self._trim()
+                    raise
+                finally:
+                    session.close()
+                written += len(batch)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                pass  # Events stay buffered; retry on the next cycle
+
+
+audit_log = AuditBuffer()
+
+
+def record_event(action, target_type, target=None, username=None, details=None):
+    """Record an audit event on the shared buffer."""
+    audit_log.record(action, target_type, target=target, username=username, details=details)
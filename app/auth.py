@@ -4,6 +4,7 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import create_access_token, jwt_required, JWTManager
 from app.database import SessionLocal
 from app.models import User
+from app.audit import record_event
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -31,12 +32,15 @@ def login():
 
         if not user or not check_password_hash(user.password_hash, password):
             session.close()
+            record_event("login", "user", username, details="failed (web)")
             flash("Invalid username or password.", "error")
             return redirect(url_for("auth.login"))
 
         login_user(user)
         session.close()
 
+        record_event("login", "user", username, username=username, details="web")
+
         flash("Login successful!", "success")
         return redirect(url_for("edl.home"))
 
@@ -62,8 +66,11 @@ def api_login():
     session.close()
 
     if not user or not check_password_hash(user.password_hash, password):
+        record_event("login", "user", username, details="failed (api)")
         return jsonify({"error": "Invalid username or password"}), 401
 
+    record_event("login", "user", username, username=username, details="api")
+
     # Create JWT token
-    access_token = create_access_token(identity=user.id)
+    access_token = create_access_token(identity=user.username)  # Identity is recorded as created_by and in the audit log
     return jsonify({"access_token": access_token}), 200
\ No newline at end of file
@@ -3,3 +3,23 @@ import os
 class Config:
     SECRET_KEY = os.getenv("FLASK_SECRET_KEY", "default_secret_key")
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "supersecretkey")
+    AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "100"))
+    AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "5"))
+    AUDIT_MAX_BUFFERED = int(os.getenv("AUDIT_MAX_BUFFERED", "10000"))  # Oldest events are dropped beyond this
+
+    # Mirror mode: replicate EDLs read-only from a primary instance
+    SENTINEDL_MODE = os.getenv("SENTINEDL_MODE", "primary")  # "primary" or "mirror"
+    PRIMARY_URL = os.getenv("PRIMARY_URL", "http://127.0.0.1:9000")
+    MIRROR_SYNC_INTERVAL = float(os.getenv("MIRROR_SYNC_INTERVAL", "30"))
+    MIRROR_TIMEOUT = float(os.getenv("MIRROR_TIMEOUT", "10"))
+    # Shared secret for the replication endpoints; they are disabled on the primary when unset
+    REPLICATION_TOKEN = os.getenv("REPLICATION_TOKEN")
+
+    # Number of EDL snapshots kept in memory for serving exports
+    SNAPSHOT_CACHE_SIZE = int(os.getenv("SNAPSHOT_CACHE_SIZE", "64"))
+
+    # Keep serving the previous revision of a list while the new one is built
+    EDL_STALE_WHILE_REVALIDATE = os.getenv("EDL_STALE_WHILE_REVALIDATE", "true").lower() == "true"
+    # Cache-Control max-age for served lists; a random 0..jitter seconds is added per response
+    EDL_CACHE_MAX_AGE = int(os.getenv("EDL_CACHE_MAX_AGE", "60"))
+    EDL_CACHE_JITTER = int(os.getenv("EDL_CACHE_JITTER", "30"))
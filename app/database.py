@@ -1,15 +1,55 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker
 from app.models import Base
 
 # Ensure database is created in the correct directory
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-DATABASE_URL = f"sqlite:///{os.path.join(BASE_DIR, '../sentinedl.db')}"
+DATABASE_URL = os.getenv("SENTINEDL_DATABASE_URL", f"sqlite:///{os.path.join(BASE_DIR, '../sentinedl.db')}")
 
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine)
 
+# Indexes made redundant by a composite index that starts with the same columns
+OBSOLETE_INDEXES = ["ix_entries_edl_id"]
+
 def init_db():
     """Initialize database and create tables."""
     Base.metadata.create_all(engine)
+    upgrade_schema()
+    backfill_entry_types()
+
+def upgrade_schema():
+    """Add columns and indexes introduced after a database was first created and drop obsolete indexes.
+
+    create_all only creates missing tables, so existing databases are upgraded here.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" NOT NULL DEFAULT {column.server_default.arg}"
+                conn.execute(text(ddl))
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        for name in OBSOLETE_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+def backfill_entry_types():
+    """Classify entries stored before entry_type existed."""
+    from app.entries import classify_entry_value
+    from app.models import Entry
+
+    session = SessionLocal()
+    rows = session.query(Entry.id, Entry.value).filter(Entry.entry_type.is_(None)).all()
+    if rows:
+        session.bulk_update_mappings(
+            Entry, [{"id": entry_id, "entry_type": classify_entry_value(value)} for entry_id, value in rows]
+        )
+        session.commit()
+    session.close()
@@ -0,0 +1,255 @@
+import base64
+import json
+import re
+from datetime import datetime
+from sqlalchemy import tuple_
+from app.models import EDL, Entry
+
+ENTRY_TYPES = ("ipv4", "ipv6", "fqdn", "url")
+
+SORT_COLUMNS = {"id": Entry.id, "value": Entry.value, "created_at": Entry.created_at}
+
+# Maximum number of bound parameters per IN (...) clause, well under SQLite's limit
+CHUNK_SIZE = 500
+
+IP_PATTERN = re.compile(r"^(\d{1,3}\.){3}\d{1,3}$")
+IPV6_PATTERN = re.compile(r"^([0-9a-fA-F]{1,4}:){1,7}[0-9a-fA-F]{1,4}$")
+FQDN_PATTERN = re.compile(r"^(\*\.)?(?!-)[A-Za-z0-9-]{1,63}(?<!-)\.(?:[A-Za-z]{2,8})$")
+URL_PATTERN = re.compile(r"^(\*\.)?([A-Za-z0-9.-]+)\.(?:[A-Za-z]{2,8})(/[\w\-._~:/?#[\]@!$&'()*+,;=]*)?$")
+
+
+def classify_entry_value(value):
+    """Return the entry type (ipv4, ipv6, fqdn, url) of a value, or None if it is not valid."""
+    if IP_PATTERN.match(value):
+        return "ipv4"
+    if IPV6_PATTERN.match(value):
+        return "ipv6"
+    if FQDN_PATTERN.match(value):
+        return "fqdn"
+    if URL_PATTERN.match(value):
+        return "url"
+    return None
+
+
+def chunked(items, size=CHUNK_SIZE):
+    """Yield successive slices of ``items`` of at most ``size`` elements."""
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def bump_revision(session, edl_id):
+    """Increment the revision of an EDL. Call once per change operation, before commit."""
+    session.query(EDL).filter_by(id=edl_id).update(
+        {EDL.revision: EDL.revision + 1}, synchronize_session=False
+    )
+
+
+def glob_to_like(pattern):
+    """Translate a ``*``/``?`` glob into a SQL LIKE pattern, escaping LIKE wildcards."""
+    escaped = pattern.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped.replace("*", "%").replace("?", "_")
+
+
+def escape_glob(pattern):
+    """Escape ``[`` so a ``*``/``?`` glob can be passed to SQLite's case-sensitive GLOB."""
+    return pattern.replace("[", "[[]")
+
+
+def parse_entry_filter(data):
+    """Validate a bulk delete filter. Returns (filters, error)."""
+    filters = {}
+
+    created_by = data.get("created_by")
+    if created_by:
+        filters["created_by"] = str(created_by).strip()
+
+    for key in ("created_after", "created_before"):
+        if data.get(key):
+            try:
+                filters[key] = datetime.fromisoformat(data[key])
+            except (TypeError, ValueError):
+                return None, f"{key} must be an ISO 8601 date or datetime."
+
+    entry_type = data.get("type")
+    if entry_type:
+        if entry_type not in ENTRY_TYPES:
+            return None, f"type must be one of: {', '.join(ENTRY_TYPES)}."
+        filters["type"] = entry_type
+
+    value_pattern = data.get("value_pattern")
+    if value_pattern:
+        filters["value_pattern"] = str(value_pattern).strip()
+
+    if not filters:
+        return None, "At least one filter is required."
+    return filters, None
+
+
+def filter_entries(query, filters):
+    """Apply filters produced by :func:`parse_entry_filter` to an Entry query."""
+    if "created_by" in filters:
+        query = query.filter(Entry.created_by == filters["created_by"])
+    if "created_after" in filters:
+        query = query.filter(Entry.created_at >= filters["created_after"])
+    if "created_before" in filters:
+        query = query.filter(Entry.created_at < filters["created_before"])
+    if "type" in filters:
+        query = query.filter(Entry.entry_type == filters["type"])
+    if "value_pattern" in filters:
+        query = query.filter(Entry.value.like(glob_to_like(filters["value_pattern"]), escape="\\"))
+    return query
+
+
+def delete_entries_by_filter(session, edl_id, filters):
+    """Delete every entry of an EDL matching ``filters`` in one statement. Returns the count."""
+    query = filter_entries(session.query(Entry).filter(Entry.edl_id == edl_id), filters)
+    deleted = query.delete(synchronize_session=False)
+    if deleted:
+        bump_revision(session, edl_id)
+    return deleted
+
+
+def delete_entries_by_values(session, edl_id, values):
+    """Delete every entry of an EDL whose value is in ``values``. Returns the count."""
+    deleted = 0
+    for chunk in chunked(set(values)):
+        deleted += (
+            session.query(Entry)
+            .filter(Entry.edl_id == edl_id, Entry.value.in_(chunk))
+            .delete(synchronize_session=False)
+        )
+    if deleted:
+        bump_revision(session, edl_id)
+    return deleted
+
+
+def replace_entries(session, edl_id, entries, username):
+    """Make the contents of an EDL equal to ``entries`` by applying only the difference.
+
+    ``entries`` maps value -> description. Values missing from the list are
+    deleted, new values are inserted and changed descriptions are updated.
+    Duplicate rows of a kept value are removed so only the oldest remains.
+    Returns a dict with the added, removed and updated counts.
+    """
+    existing = {}  # value -> [(id, description), ...] in id order
+    rows = (
+        session.query(Entry.id, Entry.value, Entry.description)
+        .filter(Entry.edl_id == edl_id)
+        .order_by(Entry.id)
+    )
+    for entry_id, value, description in rows:
+        existing.setdefault(value, []).append((entry_id, description))
+
+    removed_ids = []
+    for value, matches in existing.items():
+        stale = matches if value not in entries else matches[1:]
+        removed_ids.extend(entry_id for entry_id, _ in stale)
+
+    added = [
+        {
+            "edl_id": edl_id,
+            "value": value,
+            "description": description,
+            "entry_type": classify_entry_value(value),
+            "created_by": username,
+            "created_at": datetime.utcnow(),
+        }
+        for value, description in entries.items()
+        if value not in existing
+    ]
+    updated = [
+        {"id": existing[value][0][0], "description": description}
+        for value, description in entries.items()
+        if value in existing and existing[value][0][1] != description
+    ]
+
+    for chunk in chunked(removed_ids):
+        session.query(Entry).filter(Entry.id.in_(chunk)).delete(synchronize_session=False)
+    if added:
+        session.execute(Entry.__table__.insert(), added)
+    if updated:
+        session.bulk_update_mappings(Entry, updated)
+
+    if removed_ids or added or updated:
+        bump_revision(session, edl_id)
+
+    return {"added": len(added), "removed": len(removed_ids), "updated": len(updated)}
+
+
+def encode_cursor(sort_value, entry_id):
+    """Encode the position after an entry as an opaque pagination cursor."""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([sort_value, entry_id]).encode()).decode()
+
+
+def decode_cursor(cursor, sort):
+    """Decode a cursor produced by :func:`encode_cursor`. Returns None if it is invalid."""
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(decoded, list) or len(decoded) != 2:
+        return None
+
+    sort_value, entry_id = decoded
+    if type(entry_id) is not int:
+        return None
+    if sort == "id":
+        return (sort_value, entry_id) if type(sort_value) is int else None
+    if not isinstance(sort_value, str):
+        return None
+    if sort == "created_at":
+        try:
+            sort_value = datetime.fromisoformat(sort_value)
+        except ValueError:
+            return None
+    return sort_value, entry_id
+
+
+def page_entries(session, edl_id, sort="id", order="asc", after=None, limit=100, search=None, entry_type=None):
+    """Return one page of an EDL's entries using keyset pagination.
+
+    ``after`` is a decoded cursor ``(sort_value, id)``. A plain ``search``
+    is a prefix match served by the (edl_id, value) index; ``*`` and ``?``
+    wildcards use GLOB, so both modes are case-sensitive. A search sorted
+    by id or created_at orders the matching rows in a temporary B-tree;
+    the prefix bounds that set, and sorting by value avoids it entirely.
+    Returns ``(rows, next_cursor)``.
+    """
+    column = SORT_COLUMNS[sort]
+    descending = order == "desc"
+
+    query = session.query(
+        Entry.id, Entry.value, Entry.description, Entry.entry_type, Entry.created_by, Entry.created_at
+    ).filter(Entry.edl_id == edl_id)
+
+    if entry_type:
+        query = query.filter(Entry.entry_type == entry_type)
+
+    if search:
+        if "*" in search or "?" in search:
+            query = query.filter(Entry.value.op("GLOB")(escape_glob(search)))
+        else:
+            query = query.filter(Entry.value >= search, Entry.value < search + "\U0010ffff")
+
+    if after is not None:
+        sort_value, entry_id = after
+        if sort == "id":
+            query = query.filter(Entry.id < entry_id if descending else Entry.id > entry_id)
+        else:
+            position = tuple_(column, Entry.id)
+            cursor = tuple_(sort_value, entry_id)
+            query = query.filter(position < cursor if descending else position > cursor)
+
+    ordering = [column] if sort == "id" else [column, Entry.id]
+    query = query.order_by(*[c.desc() if descending else c.asc() for c in ordering])
+
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort), last.id)
+    return rows, next_cursor
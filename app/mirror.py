@@ -0,0 +1,202 @@
+import json
+import threading
+import time
+import urllib.parse
+import urllib.request
+from datetime import datetime
+from flask import request, jsonify
+from sqlalchemy import inspect
+from app.database import SessionLocal
+from app.entries import chunked
+from app.models import EDL, Entry, MirrorState
+
+
+class MirrorSync:
+    """Replicates EDLs from a primary SentinEDL instance into the local database.
+
+    The primary publishes the revision and creation time of every list; the
+    mirror only pulls the snapshot of lists where either differs from its
+    local copy (a recreated list restarts at revision 0) and applies the
+    difference, so unchanged lists cost one small request per sync cycle
+    regardless of their size.
+    """
+
+    def __init__(self, primary_url=None, interval=30.0, timeout=10.0):
+        self.primary_url = primary_url
+        self.interval = interval
+        self.timeout = timeout
+        self.token = None
+        self._sync_lock = threading.Lock()
+        self._thread = None
+
+    def init_app(self, app, start=True):
+        """Configure from the Flask config and, in mirror mode, make the app read-only and start syncing."""
+        if app.config.get("SENTINEDL_MODE") != "mirror":
+            return
+        self.primary_url = app.config["PRIMARY_URL"].rstrip("/")
+        self.interval = app.config.get("MIRROR_SYNC_INTERVAL", self.interval)
+        self.timeout = app.config.get("MIRROR_TIMEOUT", self.timeout)
+        self.token = app.config.get("REPLICATION_TOKEN")
+        app.before_request(reject_writes)
+        if start:
+            self.start()
+
+    def start(self):
+        """Start the background sync thread (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="mirror-sync", daemon=True)
+        self._thread.start()
+
+    def fetch(self, path):
+        """GET a JSON document from the primary."""
+        req = urllib.request.Request(f"{self.primary_url}{path}", headers={"X-Replication-Token": self.token or ""})
+        with urllib.request.urlopen(req, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def sync(self):
+        """Bring every local list up to date with the primary. Returns the number of lists pulled."""
+        with self._sync_lock:
+            remote_edls = self.fetch("/api/replication/edls")
+            now = datetime.utcnow()
+            pulled = 0
+
+            session = SessionLocal()
+            try:
+                local_edls = {edl.name: edl for edl in session.query(EDL)}
+                states = {state.edl_name: state for state in session.query(MirrorState)}
+
+                for item in remote_edls:
+                    name = item["name"]
+                    state = states.get(name)
+                    if state is None:
+                        state = MirrorState(edl_name=name)
+                        session.add(state)
+                    state.primary_revision = item["revision"]
+
+                    edl = local_edls.get(name)
+                    local_key = (edl.id, edl.revision, edl.created_at.isoformat()) if edl is not None else None
+                    if local_key != (item["id"], item["revision"], item["created_at"]):
+                        try:
+                            snapshot = self.fetch(f"/api/replication/edls/{urllib.parse.quote(name)}")
+                        except (OSError, ValueError) as e:
+                            state.last_error = str(e)
+                            session.commit()
+                            continue
+                        edl = apply_snapshot(session, edl, snapshot)
+                        state.last_synced_at = now
+                        pulled += 1
+
+                    state.synced_revision = edl.revision
+                    state.last_checked_at = now
+                    state.last_error = None
+                    session.commit()  # One transaction per list
+
+                # Lists removed on the primary
+                remote_names = {item["name"] for item in remote_edls}
+                for name, edl in local_edls.items():
+                    if name not in remote_names:
+                        if not inspect(edl).was_deleted:  # May already be replaced by apply_snapshot
+                            drop_local_edl(session, edl)
+                        if name in states:
+                            session.delete(states[name])
+                session.commit()
+            finally:
+                session.close()
+
+            return pulled
+
+    def _record_error(self, error):
+        session = SessionLocal()
+        session.query(MirrorState).update({MirrorState.last_error: error}, synchronize_session=False)
+        session.commit()
+        session.close()
+
+    def _run(self):
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                # Primary unreachable: keep serving the last synced data
+                self._record_error(str(e))
+            time.sleep(self.interval)
+
+
+def apply_snapshot(session, edl, snapshot):
+    """Make the local copy of an EDL match a primary snapshot by applying only the difference.
+
+    The EDL and its entries keep the primary's ids, so ``/edl/<id>/...``
+    URLs match the primary and rows are diffed by id on their full contents
+    (duplicate values included) and served in the same order as on the
+    primary.
+    """
+    if edl is not None and edl.id != snapshot["id"]:
+        # Recreated on the primary (or synced before ids were replicated)
+        drop_local_edl(session, edl)
+        edl = None
+    if edl is None:
+        # The primary may have reused the id of a list this mirror still has
+        other = session.get(EDL, snapshot["id"])
+        if other is not None:
+            drop_local_edl(session, other)
+        edl = EDL(id=snapshot["id"], name=snapshot["name"])
+        session.add(edl)
+    edl.description = snapshot["description"]
+    edl.created_by = snapshot["created_by"]
+    edl.created_at = datetime.fromisoformat(snapshot["created_at"])
+    session.flush()
+
+    remote = {
+        entry["id"]: {
+            "id": entry["id"],
+            "edl_id": edl.id,
+            "value": entry["value"],
+            "description": entry["description"],
+            "entry_type": entry["entry_type"],
+            "created_by": entry["created_by"],
+            "created_at": datetime.fromisoformat(entry["created_at"]),
+        }
+        for entry in snapshot["entries"]
+    }
+    columns = (Entry.id, Entry.edl_id, Entry.value, Entry.description, Entry.entry_type, Entry.created_by, Entry.created_at)
+    existing = {
+        row.id: row._asdict()
+        for row in session.query(*columns).filter(Entry.edl_id == edl.id)
+    }
+
+    removed_ids = [entry_id for entry_id in existing if entry_id not in remote]
+    updated = [row for entry_id, row in remote.items() if entry_id in existing and existing[entry_id] != row]
+    missing = [row for entry_id, row in remote.items() if entry_id not in existing]
+
+    # The primary may reuse the id of an entry that moved out of another list not yet synced
+    taken = set()
+    for chunk in chunked([row["id"] for row in missing]):
+        taken.update(entry_id for (entry_id,) in session.query(Entry.id).filter(Entry.id.in_(chunk)))
+    updated += [row for row in missing if row["id"] in taken]
+    added = [row for row in missing if row["id"] not in taken]
+
+    for chunk in chunked(removed_ids):
+        session.query(Entry).filter(Entry.id.in_(chunk)).delete(synchronize_session=False)
+    if updated:
+        session.bulk_update_mappings(Entry, updated)
+    if added:
+        session.execute(Entry.__table__.insert(), added)
+
+    edl.revision = snapshot["revision"]
+    return edl
+
+
+def drop_local_edl(session, edl):
+    """Delete a local EDL and its entries with set-based deletes."""
+    session.query(Entry).filter(Entry.edl_id == edl.id).delete(synchronize_session=False)
+    session.delete(edl)
+    session.flush()
+
+
+def reject_writes():
+    """Refuse every state-changing request on a mirror node."""
+    if request.method not in ("GET", "HEAD", "OPTIONS"):
+        return jsonify({"error": "This SentinEDL instance is a read-only mirror."}), 403
+
+
+mirror_sync = MirrorSync()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship, declarative_base
 from datetime import datetime
 from flask_login import UserMixin
@@ -14,6 +14,7 @@ class EDL(Base):
     description = Column(String, nullable=True)  # Optional description
     created_by = Column(String(50), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    revision = Column(Integer, nullable=False, default=0, server_default="0")  # Bumped once per change operation
     
     # Relationship to entries
     entries = relationship('Entry', back_populates='edl', cascade='all, delete-orphan')
@@ -23,6 +24,7 @@ class Entry(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     edl_id = Column(Integer, ForeignKey('edls.id', ondelete='CASCADE'), nullable=False)
     value = Column(String, nullable=False)  # This can be an FQDN, IP, or URL
+    entry_type = Column(String(10), nullable=True)  # ipv4, ipv6, fqdn or url
     description = Column(String, nullable=True)  # Optional description
     created_by = Column(String(50), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -30,6 +32,13 @@ class Entry(Base):
     # Relationship to edls
     edl = relationship('EDL', back_populates='entries')
 
+    # Keyset pagination, search and type filtering on the EDL detail page
+    __table_args__ = (
+        Index('ix_entries_edl_value', 'edl_id', 'value', 'id'),
+        Index('ix_entries_edl_created_at', 'edl_id', 'created_at', 'id'),
+        Index('ix_entries_edl_type', 'edl_id', 'entry_type', 'id'),
+    )
+
 class User(Base, UserMixin):
     """User model for authentication."""
     __tablename__ = "users"
@@ -38,3 +47,26 @@ class User(Base, UserMixin):
     username = Column(String(50), unique=True, nullable=False)
     password_hash = Column(String(128), nullable=False)
 
+
+class MirrorState(Base):
+    """Replication status of an EDL on a mirror node."""
+    __tablename__ = "mirror_state"
+
+    edl_name = Column(String, primary_key=True)
+    primary_revision = Column(Integer, nullable=True)  # Last revision seen on the primary
+    synced_revision = Column(Integer, nullable=True)  # Revision currently stored locally
+    last_checked_at = Column(DateTime, nullable=True)  # Last successful comparison with the primary
+    last_synced_at = Column(DateTime, nullable=True)  # Last time entries were pulled
+    last_error = Column(String, nullable=True)
+
+class AuditLog(Base):
+    """Append-only audit trail of actions performed in SentinEDL."""
+    __tablename__ = "audit_log"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    username = Column(String(50), nullable=True)  # None for anonymous/failed logins
+    action = Column(String(20), nullable=False, index=True)  # create, delete, clone, import, login
+    target_type = Column(String(20), nullable=False)  # edl, entry, user
+    target = Column(String, nullable=True)  # Name, value or id of the affected object
+    details = Column(String, nullable=True)
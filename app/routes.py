@@ -1,10 +1,13 @@
 import csv
 import io
+import json
 import re
 from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash, Response
 from app.database import SessionLocal
-from sqlalchemy.orm import joinedload 
 from app.models import EDL, Entry
+from app.audit import record_event
+from app.entries import classify_entry_value, bump_revision, page_entries, decode_cursor, SORT_COLUMNS, ENTRY_TYPES
+from app.snapshot import snapshots, set_cache_headers, stream_in_chunks
 from flask_login import login_required, current_user
 
 # Create a Flask Blueprint for EDL routes
@@ -24,18 +27,7 @@ def sanitize_description(description):
 
 def validate_entry_value(value):
     """Validate entry value to ensure it is an IP (IPv4/IPv6), FQDN (with optional wildcard), or URL (without protocol)."""
-    ip_pattern = r"^(\d{1,3}\.){3}\d{1,3}$"
-    ipv6_pattern = r"^([0-9a-fA-F]{1,4}:){1,7}[0-9a-fA-F]{1,4}$"
-    fqdn_pattern = r"^(\*\.)?(?!-)[A-Za-z0-9-]{1,63}(?<!-)\.(?:[A-Za-z]{2,8})$"
-    url_pattern = r"^(\*\.)?([A-Za-z0-9.-]+)\.(?:[A-Za-z]{2,8})(/[\w\-._~:/?#[\]@!$&'()*+,;=]*)?$"
-    
-    if re.match(ip_pattern, value):
-        return value, None
-    if re.match(ipv6_pattern, value):
-        return value, None
-    if re.match(fqdn_pattern, value):
-        return value, None
-    if re.match(url_pattern, value):
+    if classify_entry_value(value):
         return value, None
     
     return None, "Entry value must be a valid IPv4, IPv6, FQDN, or URL."
@@ -84,23 +76,73 @@ def create_edl():
     session.commit()
     session.close()
 
+    record_event("create", "edl", name, username=current_user.username)
+
     flash("EDL created successfully!", "success")
     return redirect(url_for("edl.home"))
 
 @edl_bp.route("/edl/<int:edl_id>")
 def view_edl(edl_id):
-    """View EDL details including its entries."""
+    """View EDL details. Entries are fetched page by page from list_entries."""
     session = SessionLocal()
     edl = session.query(EDL).filter_by(id=edl_id).first()
+    session.close()
     
     if not edl:
-        session.close()
         return "EDL Not Found", 404
 
-    entries = session.query(Entry).filter_by(edl_id=edl.id).all()
+    return render_template("edl_details.html", edl=edl, entry_types=ENTRY_TYPES)
+
+@edl_bp.route("/edl/<int:edl_id>/entries.json")
+def list_entries(edl_id):
+    """Return one page of an EDL's entries with keyset pagination, search, type filter and sorting."""
+    sort = request.args.get("sort", "id")
+    order = request.args.get("order", "asc")
+    entry_type = request.args.get("type") or None
+    search = request.args.get("q", "").strip() or None
+
+    if sort not in SORT_COLUMNS:
+        return jsonify({"error": f"sort must be one of: {', '.join(SORT_COLUMNS)}."}), 400
+    if order not in ("asc", "desc"):
+        return jsonify({"error": "order must be asc or desc."}), 400
+    if entry_type and entry_type not in ENTRY_TYPES:
+        return jsonify({"error": f"type must be one of: {', '.join(ENTRY_TYPES)}."}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", 100)), 1), 500)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer."}), 400
+
+    after = None
+    if request.args.get("after"):
+        after = decode_cursor(request.args["after"], sort)
+        if after is None:
+            return jsonify({"error": "Invalid cursor."}), 400
+
+    session = SessionLocal()
+    edl = session.query(EDL).filter_by(id=edl_id).first()
+
+    if not edl:
+        session.close()
+        return jsonify({"error": "EDL not found"}), 404
+
+    rows, next_cursor = page_entries(session, edl.id, sort=sort, order=order, after=after, limit=limit,
+                                     search=search, entry_type=entry_type)
     session.close()
 
-    return render_template("edl_details.html", edl=edl, entries=entries)
+    return jsonify({
+        "entries": [
+            {
+                "id": row.id,
+                "value": row.value,
+                "description": row.description,
+                "type": row.entry_type,
+                "created_by": row.created_by,
+                "created_at": str(row.created_at),
+            }
+            for row in rows
+        ],
+        "next": next_cursor,
+    })
 
 @edl_bp.route("/edl/<int:edl_id>/add_entry", methods=["POST"])
 @login_required
@@ -122,11 +164,15 @@ def add_entry(edl_id):
         return redirect(url_for("edl.view_edl", edl_id=edl_id))
     
     session = SessionLocal()
-    new_entry = Entry(edl_id=edl_id, value=value, description=description, created_by=current_user.username)  # Track creator
+    new_entry = Entry(edl_id=edl_id, value=value, description=description, entry_type=classify_entry_value(value),
+                      created_by=current_user.username)  # Track creator
     session.add(new_entry)
+    bump_revision(session, edl_id)
     session.commit()
     session.close()
 
+    record_event("create", "entry", value, username=current_user.username, details=f"edl_id={edl_id}")
+
     flash("Entry added successfully!", "success")
     return redirect(url_for("edl.view_edl", edl_id=edl_id))
 
@@ -141,11 +187,15 @@ def delete_entry(entry_id):
         session.close()
         return "Entry Not Found", 404
 
+    edl_id = entry.edl_id  # Get EDL ID before closing session
+    value = entry.value
     session.delete(entry)
+    bump_revision(session, edl_id)
     session.commit()
-    edl_id = entry.edl_id  # Get EDL ID before closing session
     session.close()
 
+    record_event("delete", "entry", value, username=current_user.username, details=f"edl_id={edl_id}")
+
     return redirect(url_for("edl.view_edl", edl_id=edl_id))
 
 @edl_bp.route("/edl/<int:edl_id>/delete", methods=["POST"])
@@ -159,10 +209,13 @@ def delete_edl(edl_id):
         session.close()
         return "EDL Not Found", 404
 
+    edl_name = edl.name
     session.delete(edl)  # Cascade deletion will remove associated entries
     session.commit()
     session.close()
 
+    record_event("delete", "edl", edl_name, username=current_user.username)
+
     return redirect(url_for("edl.home"))
 
 @edl_bp.route("/edl/<int:edl_id>/delete", methods=["GET"])
@@ -188,10 +241,13 @@ def confirm_delete_edl(edl_id):
         session.close()
         return "EDL Not Found", 404
 
+    edl_name = edl.name
     session.delete(edl)  # Cascade deletion removes associated entries
     session.commit()
     session.close()
 
+    record_event("delete", "edl", edl_name, username=current_user.username)
+
     return redirect(url_for("edl.home"))
 
 @edl_bp.route("/edl/<int:edl_id>/clone", methods=["GET"])
@@ -224,20 +280,93 @@ def clone_edl(edl_id):
         return "EDL Not Found", 404
 
     # Create cloned EDL
-    cloned_edl = EDL(name=new_name, description=description)
+    cloned_edl = EDL(name=new_name, description=description, created_by=current_user.username)
     session.add(cloned_edl)
     session.commit()
 
     # Copy entries
     for entry in original_edl.entries:
-        cloned_entry = Entry(edl_id=cloned_edl.id, value=entry.value, description=entry.description)
+        cloned_entry = Entry(edl_id=cloned_edl.id, value=entry.value, description=entry.description,
+                             entry_type=entry.entry_type, created_by=current_user.username)
         session.add(cloned_entry)
 
+    bump_revision(session, cloned_edl.id)
     session.commit()
+    original_name = original_edl.name
     session.close()
 
+    record_event("clone", "edl", new_name, username=current_user.username, details=f"source={original_name}")
+
     return redirect(url_for("edl.home"))  # Redirect to home instead of viewing the cloned EDL
 
+def generate_plaintext(snapshot):
+    """Yield a snapshot in the PanOS plain text format."""
+    for index, (_, value, description, _, created_at) in enumerate(snapshot.rows()):
+        line = f"{value} #{description} - Created at {created_at}"
+        yield f"\n{line}" if index else line
+
+def generate_json(snapshot):
+    """Yield the JSON export document entry by entry instead of building it in memory."""
+    meta = snapshot.meta
+    header = json.dumps({
+        "created_at": meta.created_at.isoformat(),
+        "created_by": meta.created_by,
+        "description": meta.description,
+        "id": meta.id,
+        "name": meta.name,
+    })
+    yield header[:-1] + ', "entries": ['
+    for index, (entry_id, value, description, created_by, created_at) in enumerate(snapshot.rows()):
+        entry = json.dumps({
+            "created_at": created_at.isoformat(),
+            "created_by": created_by,
+            "description": description,
+            "id": entry_id,
+            "value": value,
+        })
+        yield f", {entry}" if index else entry
+    yield "]}\n"
+
+def generate_csv(snapshot):
+    """Yield the CSV export document one row at a time."""
+    meta = snapshot.meta
+    edl_name = meta.name.replace(",", "")  # Remove commas
+    edl_description = meta.description.replace(",", "") if meta.description else ""
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+
+    def row(fields):
+        writer.writerow(fields)
+        line = output.getvalue()
+        output.seek(0)
+        output.truncate()
+        return line
+
+    # CSV Header
+    yield row(["EDL Name", "EDL Description", "Created By", "Entry ID", "Entry Value", "Entry Description", "Entry Created By", "Entry Created At"])
+
+    # CSV Rows
+    for entry_id, value, description, created_by, created_at in snapshot.rows():
+        yield row([
+            edl_name,
+            edl_description,
+            meta.created_by,
+            entry_id,
+            value.replace(",", ""),  # Remove commas
+            description.replace(",", "") if description else "",
+            created_by,
+            created_at
+        ])
+
+def edl_response(session, edl, fmt, generate, content_type):
+    """Stream an EDL from the shared snapshot cache with ETag and Cache-Control headers."""
+    snapshot, stale = snapshots.serve(session, edl)
+
+    response = Response(stream_in_chunks(generate(snapshot)), content_type=content_type)
+    set_cache_headers(response, snapshot.meta, fmt, stale)
+    return response.make_conditional(request)
+
 @edl_bp.route("/edl/<string:edl_name>/entries.txt", methods=["GET"])
 def get_edl_entries_plaintext(edl_name):
     """Return the EDL entries in plain text format based on the EDL name."""
@@ -248,81 +377,38 @@ def get_edl_entries_plaintext(edl_name):
         session.close()
         return "EDL Not Found", 404
 
-    entries = session.query(Entry).filter_by(edl_id=edl.id).all()
+    response = edl_response(session, edl, "txt", generate_plaintext, "text/plain")
     session.close()
-
-    response_text = "\n".join(
-        f"{entry.value} #{entry.description} - Created at {entry.created_at}"
-        for entry in entries
-    )
-
-    return response_text, 200, {"Content-Type": "text/plain"}
+    return response
 
 
 @edl_bp.route("/edl/<int:edl_id>/export/json")
 def export_edl_json(edl_id):
     """Export a single EDL and its entries as JSON."""
     session = SessionLocal()
-    edl = session.query(EDL).options(joinedload(EDL.entries)).filter_by(id=edl_id).first()  # ✅ Preload entries
-    session.close()
+    edl = session.query(EDL).filter_by(id=edl_id).first()
 
     if not edl:
+        session.close()
         flash("EDL not found.", "error")
         return redirect(url_for("edl.home"))
 
-    edl_data = {
-        "id": edl.id,
-        "name": edl.name,
-        "description": edl.description,
-        "created_by": edl.created_by,
-        "created_at": edl.created_at.isoformat(),
-        "entries": [
-            {
-                "id": entry.id,
-                "value": entry.value,
-                "description": entry.description,
-                "created_by": entry.created_by,
-                "created_at": entry.created_at.isoformat(),
-            }
-            for entry in edl.entries  # ✅ Now this works!
-        ]
-    }
-
-    return jsonify(edl_data)
+    response = edl_response(session, edl, "json", generate_json, "application/json")
+    session.close()
+    return response
 
 @edl_bp.route("/edl/<int:edl_id>/export/csv")
 def export_edl_csv(edl_id):
     """Export a single EDL and its entries as CSV."""
     session = SessionLocal()
-    edl = session.query(EDL).options(joinedload(EDL.entries)).filter_by(id=edl_id).first()
+    edl = session.query(EDL).filter_by(id=edl_id).first()
     
     if not edl:
         session.close()
         flash("EDL not found.", "error")
         return redirect(url_for("edl.home"))  # Ensure redirect if EDL is missing
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # CSV Header
-    writer.writerow(["EDL Name", "EDL Description", "Created By", "Entry ID", "Entry Value", "Entry Description", "Entry Created By", "Entry Created At"])
-
-    # CSV Rows
-    if edl.entries:
-        for entry in edl.entries:
-            writer.writerow([
-                edl.name.replace(",", ""),  # Remove commas
-                edl.description.replace(",", "") if edl.description else "",
-                edl.created_by,
-                entry.id,
-                entry.value.replace(",", ""),  # Remove commas
-                entry.description.replace(",", "") if entry.description else "",
-                entry.created_by,
-                entry.created_at
-            ])
-
-    session.close()  # Close the session properly
-
-    response = Response(output.getvalue(), content_type="text/csv")
+    response = edl_response(session, edl, "csv", generate_csv, "text/csv")
     response.headers["Content-Disposition"] = f"attachment; filename={edl.name}_export.csv"
+    session.close()  # Close the session properly
     return response  # Ensure response is always returned
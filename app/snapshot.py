@@ -0,0 +1,370 @@
+import random
+import socket
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app
+from app.database import SessionLocal
+from app.entries import ENTRY_TYPES
+from app.models import EDL, Entry
+
+KIND_IPV4 = 0
+KIND_IPV6 = 1
+KIND_TEXT = 2
+
+EPOCH = datetime(1970, 1, 1)
+NO_TIMESTAMP = -(2 ** 63)
+
+
+def _to_micros(value):
+    if value is None:
+        return NO_TIMESTAMP
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def _from_micros(value):
+    if value == NO_TIMESTAMP:
+        return None
+    return EPOCH + timedelta(microseconds=value)
+
+
+def _pack_ipv4(value):
+    """Return the packed address if it round-trips to exactly ``value``, else None."""
+    try:
+        packed = socket.inet_aton(value)
+    except OSError:
+        return None
+    return packed if socket.inet_ntoa(packed) == value else None
+
+
+def _pack_ipv6(value):
+    try:
+        packed = socket.inet_pton(socket.AF_INET6, value)
+    except OSError:
+        return None
+    return packed if socket.inet_ntop(socket.AF_INET6, packed) == value else None
+
+
+class _StringBuffer:
+    """Append-only UTF-8 byte buffer with end offsets; None values are kept aside."""
+
+    __slots__ = ("data", "ends", "nulls")
+
+    def __init__(self):
+        self.data = bytearray()
+        self.ends = array("Q")
+        self.nulls = set()
+
+    def append(self, value):
+        if value is None:
+            self.nulls.add(len(self.ends))
+        else:
+            self.data += value.encode("utf-8")
+        self.ends.append(len(self.data))
+        return len(self.ends) - 1
+
+    def get(self, index):
+        if index in self.nulls:
+            return None
+        start = self.ends[index - 1] if index else 0
+        return self.data[start:self.ends[index]].decode("utf-8")
+
+    def nbytes(self):
+        return len(self.data) + self.ends.itemsize * len(self.ends)
+
+
+class EDLMeta:
+    """Immutable metadata of the EDL a snapshot was built from."""
+
+    __slots__ = ("id", "name", "description", "created_by", "created_at", "revision")
+
+    def __init__(self, edl):
+        self.id = edl.id
+        self.name = edl.name
+        self.description = edl.description
+        self.created_by = edl.created_by
+        self.created_at = edl.created_at
+        self.revision = edl.revision
+
+    def version(self):
+        """Identifier of this list version; never repeats, even when SQLite reuses the list id."""
+        return f"{self.id}-{_to_micros(self.created_at)}-{self.revision}"
+
+
+class EDLSnapshot:
+    """Compact, read-only columnar copy of an EDL's entries at one revision.
+
+    Rows are kept in id order. IPv4 and IPv6 values are stored as packed
+    integers/bytes, every other value and all descriptions live in shared
+    UTF-8 buffers, and creators are interned, so a snapshot costs a few
+    dozen bytes per entry instead of a full ORM object per row.
+    """
+
+    __slots__ = ("meta", "ids", "created_at", "kinds", "slots", "ipv4", "ipv6",
+                 "text", "descriptions", "creators", "creator_index", "types")
+
+    def __init__(self, meta):
+        self.meta = meta
+        self.ids = array("q")
+        self.created_at = array("q")
+        self.kinds = array("B")
+        self.slots = array("Q")  # Index into ipv4, ipv6 or text depending on kind
+        self.ipv4 = array("I")
+        self.ipv6 = bytearray()
+        self.text = _StringBuffer()
+        self.descriptions = _StringBuffer()
+        self.creators = []
+        self.creator_index = array("I")
+        self.types = array("B")  # 0 = unclassified, else 1 + index into ENTRY_TYPES
+
+    @classmethod
+    def build(cls, session, edl, batch_size=10000):
+        """Build a snapshot by streaming the EDL's entries as plain tuples."""
+        snapshot = cls(EDLMeta(edl))
+        creator_ids = {}
+        rows = (
+            session.query(Entry.id, Entry.value, Entry.description, Entry.created_by, Entry.created_at,
+                          Entry.entry_type)
+            .filter(Entry.edl_id == edl.id)
+            .order_by(Entry.id)
+            .yield_per(batch_size)
+        )
+        for entry_id, value, description, created_by, created_at, entry_type in rows:
+            snapshot._append(entry_id, value, description, created_by, created_at, entry_type, creator_ids)
+        return snapshot
+
+    def _append(self, entry_id, value, description, created_by, created_at, entry_type, creator_ids):
+        packed = _pack_ipv4(value)
+        if packed is not None:
+            self.kinds.append(KIND_IPV4)
+            self.slots.append(len(self.ipv4))
+            self.ipv4.append(int.from_bytes(packed, "big"))
+        else:
+            packed = _pack_ipv6(value) if ":" in value else None
+            if packed is not None:
+                self.kinds.append(KIND_IPV6)
+                self.slots.append(len(self.ipv6) // 16)
+                self.ipv6 += packed
+            else:
+                self.kinds.append(KIND_TEXT)
+                self.slots.append(self.text.append(value))
+
+        if created_by not in creator_ids:
+            creator_ids[created_by] = len(self.creators)
+            self.creators.append(created_by)
+
+        self.ids.append(entry_id)
+        self.created_at.append(_to_micros(created_at))
+        self.descriptions.append(description)
+        self.creator_index.append(creator_ids[created_by])
+        self.types.append(ENTRY_TYPES.index(entry_type) + 1 if entry_type in ENTRY_TYPES else 0)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def value(self, index):
+        kind, slot = self.kinds[index], self.slots[index]
+        if kind == KIND_IPV4:
+            return socket.inet_ntoa(self.ipv4[slot].to_bytes(4, "big"))
+        if kind == KIND_IPV6:
+            return socket.inet_ntop(socket.AF_INET6, bytes(self.ipv6[slot * 16:slot * 16 + 16]))
+        return self.text.get(slot)
+
+    def entry_type(self, index):
+        code = self.types[index]
+        return ENTRY_TYPES[code - 1] if code else None
+
+    def rows(self):
+        """Yield (id, value, description, created_by, created_at) tuples in id order."""
+        for index in range(len(self.ids)):
+            yield (
+                self.ids[index],
+                self.value(index),
+                self.descriptions.get(index),
+                self.creators[self.creator_index[index]],
+                _from_micros(self.created_at[index]),
+            )
+
+    def nbytes(self):
+        """Approximate memory held by the snapshot's buffers."""
+        arrays = (self.ids, self.created_at, self.kinds, self.slots, self.ipv4, self.creator_index, self.types)
+        return (
+            sum(a.itemsize * len(a) for a in arrays)
+            + len(self.ipv6)
+            + self.text.nbytes()
+            + self.descriptions.nbytes()
+        )
+
+
+def stream_in_chunks(parts, size=1000):
+    """Group small string parts into larger chunks for streaming responses."""
+    buffer = []
+    for part in parts:
+        buffer.append(part)
+        if len(buffer) >= size:
+            yield "".join(buffer)
+            buffer.clear()
+    if buffer:
+        yield "".join(buffer)
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key onto one execution whose result is shared."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class _CachedList:
+    __slots__ = ("key", "snapshot")
+
+    def __init__(self, key, snapshot):
+        self.key = key
+        self.snapshot = snapshot
+
+
+class SnapshotCache:
+    """Process-wide LRU of the latest snapshot of each EDL, shared by all requests.
+
+    Builds are single-flight: concurrent requests for the same list wait
+    for one build instead of each querying the database. With
+    stale-while-revalidate enabled, a changed list keeps being served from
+    its previous revision while the new one is built in the background.
+    Responses are streamed from the snapshot; no rendered bodies are kept.
+    """
+
+    def __init__(self, max_lists=64, stale_while_revalidate=True):
+        self.max_lists = max_lists
+        self.stale_while_revalidate = stale_while_revalidate
+        self._lists = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._refreshing = set()
+
+    def init_app(self, app):
+        self.max_lists = app.config.get("SNAPSHOT_CACHE_SIZE", self.max_lists)
+        self.stale_while_revalidate = app.config.get("EDL_STALE_WHILE_REVALIDATE", self.stale_while_revalidate)
+
+    @staticmethod
+    def _key(edl):
+        return (edl.revision, edl.created_at)  # created_at guards against reused ids
+
+    def _lookup(self, edl_id):
+        with self._lock:
+            cached = self._lists.get(edl_id)
+            if cached is not None:
+                self._lists.move_to_end(edl_id)
+            return cached
+
+    def _build(self, session, edl, key):
+        def build():
+            cached = self._lookup(edl.id)
+            if cached is not None and cached.key == key:
+                return cached  # Built by a call that finished just before this one started
+            cached = _CachedList(key, EDLSnapshot.build(session, edl))
+            with self._lock:
+                self._lists[edl.id] = cached
+                self._lists.move_to_end(edl.id)
+                while len(self._lists) > self.max_lists:
+                    self._lists.popitem(last=False)
+            return cached
+
+        return self._flight.do((edl.id, key), build)
+
+    def get(self, session, edl):
+        """Return the snapshot of ``edl`` at its current revision, building it if needed."""
+        key = self._key(edl)
+        cached = self._lookup(edl.id)
+        if cached is None or cached.key != key:
+            cached = self._build(session, edl, key)
+        return cached.snapshot
+
+    def serve(self, session, edl):
+        """Return ``(snapshot, stale)`` for serving ``edl`` to clients.
+
+        With stale-while-revalidate, a list whose revision changed is served
+        from its previous snapshot (``stale`` is True) while the current one
+        is built in the background.
+        """
+        key = self._key(edl)
+        cached = self._lookup(edl.id)
+        if cached is not None and cached.key == key:
+            return cached.snapshot, False
+        if self.stale_while_revalidate and cached is not None and cached.key[1] == key[1]:
+            self._refresh_async(edl.id)
+            return cached.snapshot, True
+        return self._build(session, edl, key).snapshot, False
+
+    def _refresh_async(self, edl_id):
+        with self._lock:
+            if edl_id in self._refreshing:
+                return
+            self._refreshing.add(edl_id)
+        threading.Thread(target=self._refresh, args=(edl_id,), daemon=True).start()
+
+    def _refresh(self, edl_id):
+        session = SessionLocal()
+        try:
+            edl = session.query(EDL).filter_by(id=edl_id).first()
+            if edl is not None:
+                self.get(session, edl)
+        finally:
+            session.close()
+            with self._lock:
+                self._refreshing.discard(edl_id)
+
+
+def set_cache_headers(response, meta, fmt, stale):
+    """Add ETag, revision and Cache-Control headers for a response served from a snapshot.
+
+    Fresh responses get a max-age with random jitter to spread the fleet's
+    next polls. Stale responses must be revalidated on every request so
+    downstream caches do not hold on to a superseded revision.
+    """
+    response.set_etag(f"{meta.version()}-{fmt}")
+    response.headers["X-EDL-Revision"] = str(meta.revision)
+    if stale:
+        response.headers["Cache-Control"] = "no-cache"
+    else:
+        max_age = current_app.config["EDL_CACHE_MAX_AGE"] + random.randint(0, current_app.config["EDL_CACHE_JITTER"])
+        response.headers["Cache-Control"] = f"public, max-age={max_age}, stale-while-revalidate={max_age}"
+    return response
+
+
+snapshots = SnapshotCache()
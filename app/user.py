@@ -3,6 +3,7 @@ from flask_login import login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from app.database import SessionLocal
 from app.models import User
+from app.audit import record_event
 
 user_bp = Blueprint("user", __name__, url_prefix="/users")
 
@@ -50,6 +51,8 @@ def create_user():
     session.commit()
     session.close()
 
+    record_event("create", "user", username, username=current_user.username)
+
     flash("User created successfully!", "success")
     return redirect(url_for("user.manage_users"))
 
@@ -69,10 +72,13 @@ def delete_user(user_id):
         flash("User not found.", "error")
         return redirect(url_for("user.manage_users"))
 
+    deleted_username = user.username
     session.delete(user)
     session.commit()
     session.close()
 
+    record_event("delete", "user", deleted_username, username=current_user.username)
+
     flash("User deleted successfully!", "success")
     return redirect(url_for("user.manage_users"))
 
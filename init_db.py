@@ -5,7 +5,7 @@ from sqlalchemy.exc import OperationalError
 
 # Step 1: Ensure the database is created
 print("Initializing database...")
-Base.metadata.create_all(engine)  # Explicitly create tables
+init_db()  # Create tables and add any missing columns
 
 # Step 2: Create a default admin user
 session = SessionLocal()
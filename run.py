@@ -1,6 +1,13 @@
+import os
 from app import create_app
 
-app = create_app()
+debug = os.getenv("SENTINEDL_DEBUG", "true").lower() == "true"
+
+# With the debug reloader this module also runs in the file-watcher process,
+# which serves no requests; only the serving child starts background threads
+# so two mirror-sync threads never write to the same database.
+serving = __name__ != "__main__" or not debug or os.getenv("WERKZEUG_RUN_MAIN") == "true"
+app = create_app(start_background=serving)
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=9000, debug=True)
+    app.run(host="0.0.0.0", port=int(os.getenv("SENTINEDL_PORT", "9000")), debug=debug)